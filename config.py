@@ -0,0 +1,197 @@
+import os
+import queue
+import atexit
+import logging
+import logging.handlers
+import threading
+from functools import lru_cache
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+# Use orjson for webhook bodies when available; it encodes straight to bytes
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Per-attempt timeout for webhook POSTs (seconds)
+WEBHOOK_TIMEOUT = 5
+
+# .env file shared by all monitoring scripts
+ENV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+
+# Log file used when the configured one is not writable
+FALLBACK_LOG_FILE = os.path.expanduser('~/server_monitor.log')
+
+# Background listener that owns the log handlers, created on first setup_logging() call
+log_listener = None
+
+# Shared HTTP session so webhook POSTs from both monitors reuse keep-alive connections.
+# Created on first use: runs that raise no alert never import requests.
+_session = None
+_session_lock = threading.Lock()
+
+# Number of records buffered in memory before they are written to the log file
+LOG_BUFFER_CAPACITY = 100
+
+@lru_cache(maxsize=None)
+def load_env():
+    """Load environment variables from the .env file once per process"""
+    # Skip importing dotenv entirely when there is no .env file to read
+    if not os.path.isfile(ENV_FILE):
+        return False
+    
+    from dotenv import load_dotenv
+    
+    # Existing environment variables take precedence over values in .env
+    return load_dotenv(ENV_FILE, override=False)
+
+@lru_cache(maxsize=None)
+def get_hostname():
+    """Return the system hostname, read once from /etc/hostname"""
+    try:
+        with open('/etc/hostname') as f:
+            hostname = f.read().strip()
+        if hostname:
+            return hostname
+    except OSError:
+        pass
+    return os.uname()[1]
+
+def _is_writable(path):
+    """Return True if path can be appended to, or created if it does not exist yet"""
+    if os.path.exists(path):
+        return os.access(path, os.W_OK)
+    return os.access(os.path.dirname(os.path.abspath(path)), os.W_OK)
+
+def setup_logging(log_file):
+    """Set up logging with fallback to user home directory if system log is not writable"""
+    global log_listener
+    
+    # Only set up the log file once per process, even when both monitors run in it
+    if log_listener is not None:
+        return any(isinstance(h, (logging.FileHandler, logging.handlers.MemoryHandler)) for h in log_listener.handlers)
+    
+    logger = logging.getLogger()
+    logger.setLevel(logging.INFO)
+    
+    # Clear any existing handlers
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+    
+    # The file is opened lazily (delay=True), so check up front that it can be written
+    if _is_writable(log_file):
+        status = (logging.INFO, "Logging to %s", log_file)
+    elif _is_writable(FALLBACK_LOG_FILE):
+        # If permission denied, use a file in user's home directory
+        status = (logging.WARNING, "Permission denied for configured log file. Falling back to %s", FALLBACK_LOG_FILE)
+        log_file = FALLBACK_LOG_FILE
+    else:
+        # If that also fails, use only stderr
+        status = (logging.ERROR, "Could not write to %s or %s, using stderr only", log_file, FALLBACK_LOG_FILE)
+        log_file = None
+    
+    running_from_cron = os.environ.get('RUNNING_FROM_CRON') == 'true'
+    
+    handlers = []
+    if log_file is not None:
+        file_handler = logging.FileHandler(log_file, delay=True)
+        if running_from_cron:
+            # Cron runs are short, so batch their records in memory and write them out together
+            # on warnings, when the buffer fills, or at exit. Long-lived processes such as the
+            # daemon write every record straight away so nothing sits unwritten for hours.
+            memory_handler = logging.handlers.MemoryHandler(
+                capacity=LOG_BUFFER_CAPACITY,
+                flushLevel=logging.WARNING,
+                target=file_handler
+            )
+            handlers.append(memory_handler)
+            # Registered before the listener's stop so it runs after the queue has drained
+            atexit.register(memory_handler.flush)
+        else:
+            handlers.append(file_handler)
+    
+    has_log_file = bool(handlers)
+    
+    # Add console handler if not running from cron, or if there is no log file
+    if not has_log_file or not running_from_cron:
+        handlers.append(logging.StreamHandler())
+    
+    # Hand records to a background thread so file writes never stall the checks
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    log_listener = logging.handlers.QueueListener(log_queue, *handlers)
+    log_listener.start()
+    atexit.register(log_listener.stop)
+    
+    logger.log(*status)
+    return has_log_file
+
+def create_session(max_retries=0):
+    """Return a new pooled HTTP session that retries requests with the given urllib3 policy"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=max_retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def get_session():
+    """Return the shared HTTP session used for webhook notifications"""
+    global _session
+    
+    with _session_lock:
+        if _session is None:
+            from urllib3.util.retry import Retry
+            
+            # Re-send the same payload on transient webhook failures instead of
+            # waiting for the next run to redo the whole check. Read errors are not
+            # retried: the platform may already have accepted the message, and a
+            # retry would post a duplicate alert to the channel.
+            webhook_retry = Retry(
+                total=2,
+                read=0,
+                backoff_factor=0.5,
+                status_forcelist=(500, 502, 503, 504),
+                allowed_methods=("POST",),
+                raise_on_status=False
+            )
+            _session = create_session(webhook_retry)
+    return _session
+
+def post_json(url, message):
+    """POST message as a JSON body to url over the shared session"""
+    if orjson is not None:
+        return get_session().post(url, headers=JSON_HEADERS, data=orjson.dumps(message), timeout=WEBHOOK_TIMEOUT)
+    
+    # Without orjson let requests encode the body and set the Content-Type header itself
+    return get_session().post(url, json=message, timeout=WEBHOOK_TIMEOUT)
+
+def send_in_order(senders, *args):
+    """Call each sender in turn and return True if any notification was sent"""
+    success = False
+    for sender in senders:
+        if sender(*args):
+            success = True
+    return success
+
+def notify_all(config, senders, *args):
+    """Call the sender of each (url_key, sender) pair whose webhook URL is set in config, return True if any notification was sent"""
+    # Group senders by webhook origin. Origins are notified concurrently so total latency is the
+    # slowest origin, not the sum; webhooks behind the same origin run one after another on a single
+    # worker so they reuse one keep-alive connection instead of each paying a TLS handshake.
+    groups = {}
+    for url_key, sender in senders:
+        if config[url_key]:
+            parts = urlsplit(config[url_key])
+            groups.setdefault((parts.scheme, parts.netloc), []).append(sender)
+    
+    # Every POST is bounded by WEBHOOK_TIMEOUT and the session's retry policy, so wait for all
+    # senders and report their real outcome rather than giving up on ones that would still succeed
+    with ThreadPoolExecutor(max_workers=len(groups)) as executor:
+        futures = [executor.submit(send_in_order, senders, *args) for senders in groups.values()]
+        return any([future.result() for future in futures])
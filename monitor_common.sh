@@ -0,0 +1,17 @@
+
+# Helpers shared by setup_monitor.sh and update_monitor.sh.
+# Callers must set ENV_FILE before sourcing this file.
+
+# Existing installs ran recovery commands one after another before RECOVERY_SEQUENTIAL
+# existed; keep them that way since chains like "sync; echo 3 > /proc/sys/vm/drop_caches"
+# or "systemctl stop x; systemctl start x" rely on the order
+pin_recovery_order() {
+    if [ -f "$ENV_FILE" ] && grep -q -E "^RECOVERY_COMMANDS=.+" "$ENV_FILE" && ! grep -q "^RECOVERY_SEQUENTIAL=" "$ENV_FILE"; then
+        # Make sure the new setting starts on its own line
+        if [ -n "$(tail -c 1 "$ENV_FILE")" ]; then
+            echo "" >> "$ENV_FILE"
+        fi
+        echo "RECOVERY_SEQUENTIAL=true" >> "$ENV_FILE"
+        echo "Existing recovery commands found, keeping them sequential: added RECOVERY_SEQUENTIAL=true to $ENV_FILE"
+    fi
+}
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+import os
+import signal
+import asyncio
+import logging
+import server_monitor
+import network_monitor
+from config import load_env, setup_logging
+
+# Load environment variables from .env file
+load_env()
+
+# Configuration
+CONFIG = {
+    'network_check_every': int(os.environ.get('NETWORK_CHECK_EVERY', '600')),    # Seconds between network checks
+    'resource_check_every': int(os.environ.get('RESOURCE_CHECK_EVERY', '1800')),  # Seconds between resource checks
+    'log_file': os.environ.get('LOG_FILE', '/var/log/server_monitor.log'),
+}
+
+logger = logging.getLogger()
+
+async def run_every(name, interval, check):
+    """Run a blocking check in a worker thread every interval seconds"""
+    loop = asyncio.get_running_loop()
+    
+    while True:
+        started = loop.time()
+        logger.info("Running scheduled %s check", name)
+        
+        try:
+            await asyncio.to_thread(check)
+        except Exception as e:
+            logger.error("Error in scheduled %s check: %s", name, e, exc_info=True)
+        
+        # Keep a fixed schedule; start right away if the check overran its slot
+        await asyncio.sleep(max(0, interval - (loop.time() - started)))
+
+async def run_daemon():
+    """Run the network and resource checks on independent schedules until stopped"""
+    # systemctl stop sends SIGTERM, which would otherwise kill the process without running
+    # atexit; cancel the schedules instead so the process exits normally and flushes its logs
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    
+    try:
+        await asyncio.gather(
+            run_every("network", CONFIG['network_check_every'], network_monitor.main),
+            run_every("resource", CONFIG['resource_check_every'], server_monitor.main),
+        )
+    except asyncio.CancelledError:
+        logger.info("Received SIGTERM, waiting for running checks to finish")
+
+def main():
+    """Main function to run both monitors in a single long-lived process"""
+    setup_logging(CONFIG['log_file'])
+    logger.info(
+        "Starting monitor daemon (network every %ss, resources every %ss)",
+        CONFIG['network_check_every'], CONFIG['resource_check_every']
+    )
+    
+    try:
+        asyncio.run(run_daemon())
+    except KeyboardInterrupt:
+        pass
+    logger.info("Monitor daemon stopped")
+
+if __name__ == "__main__":
+    main()
@@ -4,129 +4,169 @@ import os
 import sys
 import json
 import time
+import random
+import socket
 import logging
-import requests
-from datetime import datetime
-from dotenv import load_dotenv
+from functools import lru_cache
+from urllib.parse import urlsplit
+from config import load_env, setup_logging, get_hostname, create_session, notify_all, post_json
 
 # Load environment variables from .env file
-load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
+load_env()
 
 # Configuration
 CONFIG = {
     'feishu_webhook_url': os.environ.get('FEISHU_WEBHOOK_URL', ''),  # Feishu webhook
     'slack_webhook_url': os.environ.get('SLACK_WEBHOOK_URL', ''),    # Slack webhook
     'mattermost_webhook_url': os.environ.get('MATTERMOST_WEBHOOK_URL', ''),  # Mattermost webhook
-    'hostname': os.environ.get('CUSTOM_HOSTNAME', os.uname()[1]),
+    'hostname': os.environ.get('CUSTOM_HOSTNAME') or get_hostname(),
     'log_file': os.environ.get('LOG_FILE', '/var/log/server_monitor.log'),
     'test_mode': False,
     
     # Network check configurations
     'network_check_target': os.environ.get('NETWORK_CHECK_TARGET', 'https://www.google.com'),
-    'network_timeout': os.environ.get('NETWORK_TIMEOUT', 5),  # Timeout in seconds
-    'max_retry': os.environ.get('MAX_RETRY', 5),  # Number of retries
-    'retry_interval': os.environ.get('RETRY_INTERVAL', 10),  # Retry interval in seconds
+    'network_check_mode': os.environ.get('NETWORK_CHECK_MODE', 'tcp').strip().lower(),  # tcp, dns or http
+    'network_timeout': float(os.environ.get('NETWORK_TIMEOUT', '5')),  # Timeout in seconds
+    'max_retry': int(os.environ.get('MAX_RETRY', '5')),  # Number of retries
+    'retry_base_delay': float(os.environ.get('RETRY_BASE_DELAY', '1')),  # First backoff delay in seconds, doubled on each retry
+    'retry_interval': float(os.environ.get('RETRY_INTERVAL', '10')),  # Maximum backoff delay between retries in seconds
+    'max_total_wait': float(os.environ.get('MAX_TOTAL_WAIT', '60')),  # Overall retry budget in seconds
+    'probe_retries': int(os.environ.get('PROBE_RETRIES', '2')),  # Quick retries inside a single http check
 }
 
-# Setup logging with fallback mechanism
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger()
 
-# Clear any existing handlers
-for handler in logger.handlers[:]:
-    logger.removeHandler(handler)
+# Message text that only depends on configuration is built once at startup;
+# per-alert fields are filled into precompiled format templates
+NETWORK_DOWN_TITLE = f"Network Down - {CONFIG['hostname']}"
+NETWORK_DOWN_DETAILS = "Network connectivity issue detected:\n{bullet} {check_result}".format
+FEISHU_TITLE = f"❌ {NETWORK_DOWN_TITLE}"
+SLACK_HEADER = f"❌ *{NETWORK_DOWN_TITLE}*"
+MATTERMOST_TEXT = (
+    "#### :x: " + NETWORK_DOWN_TITLE.replace("{", "{{").replace("}", "}}") + "\n\n"
+    "{details}\n\n"
+    "*Check Time: {timestamp}*"
+).format
 
-# Try to use configured log file, fall back to user directory if permission denied
-log_file = CONFIG['log_file']
-fallback_log_file = os.path.expanduser('~/server_monitor.log')
+@lru_cache(maxsize=None)
+def get_probe_session():
+    """Return the HTTP session used by the http check, importing requests on first use"""
+    from urllib3.util.retry import Retry
+    
+    # Let urllib3 absorb brief DNS/connect hiccups and 5xx responses within a single
+    # http check; sustained outages are still handled by the backoff loop in main().
+    # Retry-After is ignored: urllib3 would sleep for however long the server asks,
+    # leaving a single check unbounded and breaking the MAX_TOTAL_WAIT budget.
+    probe_retry = Retry(
+        total=CONFIG['probe_retries'],
+        backoff_factor=0.5,
+        status_forcelist=(500, 502, 503, 504),
+        raise_on_status=False,
+        respect_retry_after_header=False
+    )
+    return create_session(probe_retry)
+
+def get_target_address(target):
+    """Return the (host, port) pair the network check target URL points at"""
+    parsed = urlsplit(target)
+    host = parsed.hostname or target
+    port = parsed.port or (80 if parsed.scheme == 'http' else 443)
+    return host, port
+
+def check_network():
+    """Check if network is working using the configured check mode"""
+    mode = CONFIG['network_check_mode']
+    
+    if mode == 'tcp':
+        return check_network_tcp()
+    if mode == 'dns':
+        return check_network_dns()
+    if mode != 'http':
+        logger.warning("Unknown network check mode '%s', falling back to http", mode)
+    return check_network_http()
 
-def setup_logging():
-    """Set up logging with fallback to user home directory if system log is not writable"""
-    global log_file
+def check_network_tcp():
+    """Check if network is working by opening a TCP connection to the target host"""
+    host, port = get_target_address(CONFIG['network_check_target'])
+    timeout = CONFIG['network_timeout']
+    
+    logger.info("Checking network connectivity to %s:%s", host, port)
     
     try:
-        # Try to use the configured log file
-        file_handler = logging.FileHandler(log_file)
-        logger.addHandler(file_handler)
+        with socket.create_connection((host, port), timeout=timeout):
+            pass
+        logger.info("Network check successful: connected to %s:%s", host, port)
+        return True, f"TCP connection to {host}:{port} successful"
         
-        # Add console handler if not running from cron
-        if os.environ.get('RUNNING_FROM_CRON') != 'true':
-            logger.addHandler(logging.StreamHandler())
-            
-        logger.info(f"Logging to {log_file}")
-        return True
-    except PermissionError:
-        # If permission denied, try to use a file in user's home directory
-        try:
-            log_file = fallback_log_file
-            file_handler = logging.FileHandler(log_file)
-            logger.addHandler(file_handler)
-            
-            # Add console handler if not running from cron
-            if os.environ.get('RUNNING_FROM_CRON') != 'true':
-                logger.addHandler(logging.StreamHandler())
-                
-            logger.warning(f"Permission denied for configured log file. Falling back to {log_file}")
-            return True
-        except Exception as e:
-            # If that also fails, use only stderr
-            logger.addHandler(logging.StreamHandler())
-            logger.error(f"Could not create any log file, using stderr only: {str(e)}")
-            return False
+    except socket.timeout:
+        logger.warning("Network check failed: connection to %s:%s timed out", host, port)
+        return False, f"TCP connection to {host}:{port} timed out after {timeout}s"
+        
+    except OSError as e:
+        logger.warning("Network check failed: could not connect to %s:%s: %s", host, port, e)
+        return False, f"TCP connection to {host}:{port} failed: {str(e)}"
 
-# Initialize logging
-setup_logging()
+def check_network_dns():
+    """Check if network is working by resolving the target host name"""
+    host, port = get_target_address(CONFIG['network_check_target'])
+    
+    logger.info("Checking DNS resolution of %s", host)
+    
+    try:
+        socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        logger.info("Network check successful: resolved %s", host)
+        return True, f"DNS lookup of {host} successful"
+        
+    except OSError as e:
+        logger.warning("Network check failed: could not resolve %s: %s", host, e)
+        return False, f"DNS lookup of {host} failed: {str(e)}"
 
-def check_network():
+def check_network_http():
     """Check if network is working by making an HTTP request to the target URL"""
+    import requests
+    
     target = CONFIG['network_check_target']
     timeout = CONFIG['network_timeout']
     
-    logger.info(f"Checking network connectivity to {target}")
+    logger.info("Checking network connectivity to %s", target)
     
     try:
-        response = requests.head(target, timeout=timeout, allow_redirects=True)
+        response = get_probe_session().head(target, timeout=timeout, allow_redirects=True)
         status_code = response.status_code
         
         if 200 <= status_code < 400:  # Consider any 2xx or 3xx response as success
-            logger.info(f"Network check successful: {target} responded with status code {status_code}")
+            logger.info("Network check successful: %s responded with status code %s", target, status_code)
             return True, f"HTTP request to {target} successful (Status code: {status_code})"
         else:
-            logger.warning(f"Network check failed: {target} responded with status code {status_code}")
+            logger.warning("Network check failed: %s responded with status code %s", target, status_code)
             return False, f"HTTP request to {target} failed (Status code: {status_code})"
             
     except requests.exceptions.Timeout:
-        logger.warning(f"Network check failed: connection to {target} timed out")
+        logger.warning("Network check failed: connection to %s timed out", target)
         return False, f"HTTP request to {target} timed out after {timeout}s"
         
     except requests.exceptions.ConnectionError:
-        logger.warning(f"Network check failed: could not connect to {target}")
+        logger.warning("Network check failed: could not connect to %s", target)
         return False, f"HTTP request to {target} failed: Connection error"
         
     except Exception as e:
-        logger.warning(f"Network check failed with error: {str(e)}")
+        logger.warning("Network check failed with error: %s", e)
         return False, f"HTTP request to {target} failed: {str(e)}"
 
-def send_feishu_notification(is_network_up, check_result):
+def send_feishu_notification(is_network_up, check_result, timestamp):
     """Send network status alert to Feishu webhook"""
     # Skip if webhook not configured
     if not CONFIG['feishu_webhook_url']:
         logger.info("Feishu webhook URL not configured, skipping notification")
         return False
 
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
     # Set title and content based on network status
     if is_network_up:
         # Don't send notification for successful checks
         return False
     else:
-        title = f"❌ Network Down - {CONFIG['hostname']}"
+        title = FEISHU_TITLE
         header_template = "red"
-        content_prefix = "Network connectivity issue detected:"
     
     # Create message
     message = {
@@ -147,7 +187,7 @@ def send_feishu_notification(is_network_up, check_result):
                     "tag": "div",
                     "text": {
                         "tag": "lark_md",
-                        "content": f"{content_prefix}\n• {check_result}"
+                        "content": NETWORK_DOWN_DETAILS(bullet="•", check_result=check_result)
                     }
                 },
                 {
@@ -170,45 +210,39 @@ def send_feishu_notification(is_network_up, check_result):
         return True
     
     try:
-        response = requests.post(
-            CONFIG['feishu_webhook_url'],
-            headers={"Content-Type": "application/json"},
-            data=json.dumps(message)
-        )
+        response = post_json(CONFIG['feishu_webhook_url'], message)
         if response.status_code == 200:
             logger.info("Network alert sent to Feishu successfully")
             return True
         else:
-            logger.error(f"Failed to send network alert to Feishu: {response.status_code} {response.text}")
+            logger.error("Failed to send network alert to Feishu: %s %s", response.status_code, response.text)
             return False
     except Exception as e:
-        logger.error(f"Error sending network alert to Feishu: {str(e)}")
+        logger.error("Error sending network alert to Feishu: %s", e)
         return False
 
-def send_slack_notification(is_network_up, check_result):
+def send_slack_notification(is_network_up, check_result, timestamp):
     """Send network status alert to Slack webhook"""
     # Skip if webhook not configured or if network is up
     if not CONFIG['slack_webhook_url'] or is_network_up:
         return False
     
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
     # Create Slack message payload
     message = {
-        "text": f"Network Down - {CONFIG['hostname']}",
+        "text": NETWORK_DOWN_TITLE,
         "blocks": [
             {
                 "type": "section",
                 "text": {
                     "type": "mrkdwn",
-                    "text": f"❌ *Network Down - {CONFIG['hostname']}*"
+                    "text": SLACK_HEADER
                 }
             },
             {
                 "type": "section",
                 "text": {
                     "type": "mrkdwn",
-                    "text": f"Network connectivity issue detected:\n• {check_result}"
+                    "text": NETWORK_DOWN_DETAILS(bullet="•", check_result=check_result)
                 }
             },
             {
@@ -229,34 +263,27 @@ def send_slack_notification(is_network_up, check_result):
         return True
     
     try:
-        response = requests.post(
-            CONFIG['slack_webhook_url'],
-            headers={"Content-Type": "application/json"},
-            data=json.dumps(message)
-        )
+        response = post_json(CONFIG['slack_webhook_url'], message)
         if response.status_code == 200:
             logger.info("Network alert sent to Slack successfully")
             return True
         else:
-            logger.error(f"Failed to send network alert to Slack: {response.status_code} {response.text}")
+            logger.error("Failed to send network alert to Slack: %s %s", response.status_code, response.text)
             return False
     except Exception as e:
-        logger.error(f"Error sending network alert to Slack: {str(e)}")
+        logger.error("Error sending network alert to Slack: %s", e)
         return False
 
-def send_mattermost_notification(is_network_up, check_result):
+def send_mattermost_notification(is_network_up, check_result, timestamp):
     """Send network status alert to Mattermost webhook"""
     # Skip if webhook not configured or if network is up
     if not CONFIG['mattermost_webhook_url'] or is_network_up:
         return False
     
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
     # Create Mattermost message text
-    text = (
-        f"#### :x: Network Down - {CONFIG['hostname']}\n\n"
-        f"Network connectivity issue detected:\n* {check_result}\n\n"
-        f"*Check Time: {timestamp}*"
+    text = MATTERMOST_TEXT(
+        details=NETWORK_DOWN_DETAILS(bullet="*", check_result=check_result),
+        timestamp=timestamp
     )
     
     # Create message payload
@@ -270,19 +297,15 @@ def send_mattermost_notification(is_network_up, check_result):
         return True
     
     try:
-        response = requests.post(
-            CONFIG['mattermost_webhook_url'],
-            headers={"Content-Type": "application/json"},
-            data=json.dumps(message)
-        )
+        response = post_json(CONFIG['mattermost_webhook_url'], message)
         if response.status_code == 200:
             logger.info("Network alert sent to Mattermost successfully")
             return True
         else:
-            logger.error(f"Failed to send network alert to Mattermost: {response.status_code} {response.text}")
+            logger.error("Failed to send network alert to Mattermost: %s %s", response.status_code, response.text)
             return False
     except Exception as e:
-        logger.error(f"Error sending network alert to Mattermost: {str(e)}")
+        logger.error("Error sending network alert to Mattermost: %s", e)
         return False
 
 def send_alert(is_network_up, check_result):
@@ -296,25 +319,19 @@ def send_alert(is_network_up, check_result):
         logger.error("No notification webhook URLs configured. Set at least one webhook URL in the environment variables.")
         return False
     
-    success = False
-    
-    # Send to all configured platforms
-    if CONFIG['feishu_webhook_url']:
-        if send_feishu_notification(is_network_up, check_result):
-            success = True
-    
-    if CONFIG['slack_webhook_url']:
-        if send_slack_notification(is_network_up, check_result):
-            success = True
-    
-    if CONFIG['mattermost_webhook_url']:
-        if send_mattermost_notification(is_network_up, check_result):
-            success = True
+    senders = (
+        ('feishu_webhook_url', send_feishu_notification),
+        ('slack_webhook_url', send_slack_notification),
+        ('mattermost_webhook_url', send_mattermost_notification),
+    )
     
-    return success
+    # One timestamp for all platforms so every notification reports the same check time
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+    return notify_all(CONFIG, senders, is_network_up, check_result, timestamp)
 
 def main():
     """Main function to check network connectivity and send alerts if needed"""
+    setup_logging(CONFIG['log_file'])
     logger.info("Starting network connectivity check")
     
     try:
@@ -327,9 +344,9 @@ def main():
         if not (CONFIG['feishu_webhook_url'] or CONFIG['slack_webhook_url'] or CONFIG['mattermost_webhook_url']) and not CONFIG['test_mode']:
             logger.warning("No notification webhook URLs configured. Set at least one webhook URL in the environment variables.")
         
-        # Try to check network connectivity with retries
+        # Try to check network connectivity with exponential backoff and jitter
         max_retry = CONFIG['max_retry']
-        retry_interval = CONFIG['retry_interval']
+        deadline = time.monotonic() + CONFIG['max_total_wait']
         is_network_up = False
         check_result = ""
         
@@ -339,8 +356,18 @@ def main():
                 break
                 
             if attempt < max_retry - 1:
-                logger.info(f"Network check failed. Retrying in {retry_interval} seconds... (Attempt {attempt+1}/{max_retry})")
-                time.sleep(retry_interval)
+                delay = min(CONFIG['retry_interval'], CONFIG['retry_base_delay'] * 2 ** attempt)
+                delay *= random.uniform(0.5, 1.5)
+                
+                # Never run past the overall budget so cron invocations don't overlap
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.info("Retry budget of %ss exhausted after %s attempts", CONFIG['max_total_wait'], attempt+1)
+                    break
+                delay = min(delay, remaining)
+                
+                logger.info("Network check failed. Retrying in %.1f seconds... (Attempt %s/%s)", delay, attempt+1, max_retry)
+                time.sleep(delay)
         
         # Send alert if network is down
         if not is_network_up:
@@ -350,7 +377,7 @@ def main():
             logger.info("Network connectivity is up")
             
     except Exception as e:
-        logger.error(f"Error in network monitoring script: {str(e)}", exc_info=True)
+        logger.error("Error in network monitoring script: %s", e, exc_info=True)
 
 if __name__ == "__main__":
     main()
@@ -4,15 +4,15 @@ import os
 import sys
 import json
 import time
+import heapq
+import asyncio
 import logging
 import psutil
-import requests
 import subprocess
-from datetime import datetime
-from dotenv import load_dotenv
+from config import load_env, setup_logging, get_hostname, notify_all, post_json
 
 # Load environment variables from .env file
-load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
+load_env()
 
 # Configuration
 CONFIG = {
@@ -27,107 +27,298 @@ CONFIG = {
     },
     'check_interval': int(os.environ.get('CHECK_INTERVAL', '60')),
     'check_count': int(os.environ.get('CHECK_COUNT', '3')),
-    'hostname': os.environ.get('CUSTOM_HOSTNAME', os.uname()[1]),
+    'hostname': os.environ.get('CUSTOM_HOSTNAME') or get_hostname(),
     'log_file': os.environ.get('LOG_FILE', '/var/log/server_monitor.log'),
     'test_mode': False,
     'recovery_commands': os.environ.get('RECOVERY_COMMANDS', '').strip(),
-    'recovery_wait_time': int(os.environ.get('RECOVERY_WAIT_TIME', '10'))
+    'recovery_wait_time': int(os.environ.get('RECOVERY_WAIT_TIME', '10')),
+    'recovery_sequential': os.environ.get('RECOVERY_SEQUENTIAL', 'false').lower() == 'true',  # Run recovery commands one after another
+    
+    # Disk usage changes slowly, so it is re-read at most this often (seconds)
+    'disk_refresh_interval': 30,
 }
 
-# Setup logging with fallback mechanism
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger()
+# Monitored resources and their thresholds as parallel tuples, frozen once at startup
+_RESOURCES = tuple(CONFIG['thresholds'])
+_THRESHOLDS = tuple(CONFIG['thresholds'][resource] for resource in _RESOURCES)
 
-# Clear any existing handlers
-for handler in logger.handlers[:]:
-    logger.removeHandler(handler)
+# Display titles for each resource, e.g. 'memory_percent' -> 'Memory Percent'
+_TITLE_CACHE = {resource: resource.replace('_', ' ').title() for resource in CONFIG['thresholds']}
 
-# Try to use configured log file, fall back to user directory if permission denied
-log_file = CONFIG['log_file']
-fallback_log_file = os.path.expanduser('~/server_monitor.log')
+logger = logging.getLogger()
 
-def setup_logging():
-    """Set up logging with fallback to user home directory if system log is not writable"""
-    global log_file
-    
+def _read_memory_percents():
+    """Return (memory_percent, swap_percent) from a single read of /proc/meminfo"""
     try:
-        # Try to use the configured log file
-        file_handler = logging.FileHandler(log_file)
-        logger.addHandler(file_handler)
-        
-        # Add console handler if not running from cron
-        if os.environ.get('RUNNING_FROM_CRON') != 'true':
-            logger.addHandler(logging.StreamHandler())
-            
-        logger.info(f"Logging to {log_file}")
-        return True
-    except PermissionError:
-        # If permission denied, try to use a file in user's home directory
-        try:
-            log_file = fallback_log_file
-            file_handler = logging.FileHandler(log_file)
-            logger.addHandler(file_handler)
-            
-            # Add console handler if not running from cron
-            if os.environ.get('RUNNING_FROM_CRON') != 'true':
-                logger.addHandler(logging.StreamHandler())
-                
-            logger.warning(f"Permission denied for configured log file. Falling back to {log_file}")
-            return True
-        except Exception as e:
-            # If that also fails, use only stderr
-            logger.addHandler(logging.StreamHandler())
-            logger.error(f"Could not create any log file, using stderr only: {str(e)}")
-            return False
+        meminfo = {}
+        with open('/proc/meminfo', 'rb') as f:
+            for line in f:
+                key, value = line.split(b':', 1)
+                meminfo[key] = int(value.split()[0])
+        mem_total = meminfo[b'MemTotal']
+        mem_available = meminfo[b'MemAvailable']
+        swap_total = meminfo[b'SwapTotal']
+        swap_free = meminfo[b'SwapFree']
+    except (OSError, KeyError, ValueError):
+        # Not Linux or an unexpected format, let psutil work it out
+        return psutil.virtual_memory().percent, psutil.swap_memory().percent
+    
+    memory_percent = round((mem_total - mem_available) / mem_total * 100, 1)
+    swap_percent = round((swap_total - swap_free) / swap_total * 100, 1) if swap_total else 0.0
+    return memory_percent, swap_percent
+
+def _read_disk_percent(path='/'):
+    """Return disk usage percent for path using a single statvfs call"""
+    st = os.statvfs(path)
+    used = (st.f_blocks - st.f_bfree) * st.f_frsize
+    total = used + st.f_bavail * st.f_frsize  # Space available to non-root users, as df reports it
+    return round(used / total * 100, 1) if total else 0.0
+
+# Last disk usage reading and when it was taken (time.monotonic)
+_disk_cache = {'t': None, 'v': 0.0}
 
-# Initialize logging
-setup_logging()
+def _cached_disk_percent(path='/'):
+    """Return disk usage percent for path, refreshed at most every disk_refresh_interval seconds"""
+    now = time.monotonic()
+    if _disk_cache['t'] is None or now - _disk_cache['t'] >= CONFIG['disk_refresh_interval']:
+        _disk_cache.update(t=now, v=_read_disk_percent(path))
+    return _disk_cache['v']
 
 def get_system_stats():
     """Get current system resource usage stats"""
+    memory_percent, swap_percent = _read_memory_percents()
     stats = {
-        'memory_percent': psutil.virtual_memory().percent,
-        'cpu_percent': psutil.cpu_percent(interval=1),
-        'swap_percent': psutil.swap_memory().percent,
-        'disk_percent': psutil.disk_usage('/').percent,
-        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        'memory_percent': memory_percent,
+        # Non-blocking: usage since the previous call, primed in check_resource_issues()
+        'cpu_percent': psutil.cpu_percent(interval=None),
+        'swap_percent': swap_percent,
+        'disk_percent': _cached_disk_percent('/'),
+        'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
     }
     return stats
 
-def check_resource_issues():
-    """Check if any resource exceeds the threshold multiple times"""
+def _quick_stats():
+    """Get memory, swap and disk usage without sampling CPU"""
+    memory_percent, swap_percent = _read_memory_percents()
+    return {
+        'memory_percent': memory_percent,
+        'swap_percent': swap_percent,
+        'disk_percent': _cached_disk_percent('/')
+    }
+
+def check_resource_issues(check_count=None):
+    """Check if any resource exceeds the threshold check_count times in a row (default: CONFIG['check_count'])"""
+    # Bind loop-invariant configuration to locals once
+    resources = _RESOURCES
+    thresholds = _THRESHOLDS
+    if check_count is None:
+        check_count = CONFIG['check_count']
+    check_interval = CONFIG['check_interval']
+    
     alerts = []
-    consecutive_alerts = {k: 0 for k in CONFIG['thresholds'].keys()}
+    # Consecutive breach counters, positionally aligned with resources
+    consecutive_alerts = [0] * len(resources)
+    stats = None
+    
+    # Prime the CPU counter so the first non-blocking sample covers exactly one interval
+    psutil.cpu_percent(interval=None)
     
-    for _ in range(CONFIG['check_count']):
+    for iteration in range(check_count):
+        # Wait before each check so the CPU sample covers a full interval
+        time.sleep(check_interval)
+        
         stats = get_system_stats()
-        logger.info(f"Current stats: {stats}")
+        logger.info("Current stats: %s", stats)
         
         # Check each resource
-        for resource, threshold in CONFIG['thresholds'].items():
-            if stats[resource] > threshold:
-                consecutive_alerts[resource] += 1
-                logger.warning(f"{resource} is high: {stats[resource]}% (threshold: {threshold}%)")
+        for i, resource in enumerate(resources):
+            if stats[resource] > thresholds[i]:
+                consecutive_alerts[i] += 1
+                logger.warning("%s is high: %s%% (threshold: %s%%)", resource, stats[resource], thresholds[i])
             else:
-                consecutive_alerts[resource] = 0
-                
-        # Wait before next check
-        time.sleep(CONFIG['check_interval'])
-    
-    # Only alert if a resource exceeded threshold for all checks
-    for resource, count in consecutive_alerts.items():
-        if count >= CONFIG['check_count']:
-            stats = get_system_stats()
+                consecutive_alerts[i] = 0
+        
+        # Stop early once no resource can still reach check_count consecutive breaches
+        remaining = check_count - iteration - 1
+        if max(consecutive_alerts) + remaining < check_count:
+            logger.info("No resource can reach the alert threshold in the remaining checks, stopping early")
+            return [], stats
+    
+    # Only alert if a resource exceeded threshold for all checks,
+    # reporting values from the last snapshot which was just taken
+    for resource, threshold, count in zip(resources, thresholds, consecutive_alerts):
+        if count >= check_count:
             alerts.append({
                 'resource': resource,
                 'value': stats[resource],
-                'threshold': CONFIG['thresholds'][resource]
+                'threshold': threshold
+            })
+    
+    return alerts, stats
+
+def wait_for_recovery():
+    """Poll memory, swap and disk every second; return True once all are below thresholds, or False after recovery_wait_time"""
+    deadline = time.monotonic() + CONFIG['recovery_wait_time']
+    
+    # CPU is left out: a one-second sample says nothing about sustained load, so it is
+    # judged by the confirmation check that follows
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        
+        time.sleep(min(1, remaining))
+        stats = _quick_stats()
+        if all(stats[resource] <= threshold for resource, threshold in zip(_RESOURCES, _THRESHOLDS) if resource in stats):
+            return True
+
+# Physical memory in pages, used to turn /proc/<pid>/statm RSS into a percentage
+TOTAL_PAGES = os.sysconf('SC_PHYS_PAGES')
+
+# Window over which CPU usage of the top memory processes is measured (seconds)
+TOP_PROCESS_CPU_WINDOW = 0.2
+
+def _measure_cpu_percent(candidates):
+    """Measure CPU usage of (process, info) candidates over a short window and return their info dicts"""
+    # A process's first cpu_percent() call only primes its counters and always returns 0.0
+    primed = []
+    for process, info in candidates:
+        try:
+            process.cpu_percent(interval=None)
+        except psutil.Error:
+            continue  # Process exited or denied access
+        primed.append((process, info))
+    
+    time.sleep(TOP_PROCESS_CPU_WINDOW)
+    
+    top_processes = []
+    for process, info in primed:
+        try:
+            info['cpu_percent'] = process.cpu_percent(interval=None)
+        except psutil.Error:
+            continue
+        top_processes.append(info)
+    return top_processes
+
+def _top_memory_processes(n=5):
+    """Return info dicts for the n processes using the most resident memory"""
+    try:
+        entries = os.scandir('/proc')
+    except OSError:
+        # No /proc (not Linux), fall back to a psutil scan and only sample CPU for the winners
+        processes = psutil.process_iter(['pid', 'name', 'memory_percent'])
+        # memory_percent is None for processes that exit or deny access mid-scan
+        top = heapq.nlargest(n, processes, key=lambda p: p.info['memory_percent'] or 0.0)
+        return _measure_cpu_percent([
+            (process, {
+                'pid': process.info['pid'],
+                'name': process.info['name'],
+                'memory_percent': process.info['memory_percent'] or 0.0
             })
+            for process in top
+        ])
+    
+    # Rank by RSS from /proc/<pid>/statm, only resolving details for the winners
+    rss_pages = []
+    with entries:
+        for entry in entries:
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry.name}/statm', 'rb') as f:
+                    rss_pages.append((int(f.read().split()[1]), int(entry.name)))
+            except (OSError, IndexError, ValueError):
+                continue  # Process exited while scanning
+    
+    candidates = []
+    for rss, pid in heapq.nlargest(n, rss_pages):
+        try:
+            process = psutil.Process(pid)
+            name = process.name()
+        except psutil.Error:
+            continue
+        candidates.append((process, {
+            'pid': pid,
+            'name': name,
+            'memory_percent': rss / TOTAL_PAGES * 100
+        }))
+    return _measure_cpu_percent(candidates)
+
+def _fmt_alert(a, bullet="•"):
+    """Format a single alert line using the platform's bullet markup"""
+    return f"{bullet} {_TITLE_CACHE[a['resource']]}: {a['value']:.1f}% (threshold: {a['threshold']}%)"
+
+def _build_alert_details(alerts, bullet):
+    """Format one line per alert using the platform's bullet markup"""
+    return "\n".join([_fmt_alert(a, bullet) for a in alerts])
+
+def _stats_template(bullet, emphasis, footer=""):
+    """Build a str.format template for the current system stats section"""
+    return (
+        f"{emphasis}Current System Stats:{emphasis}\n"
+        f"{bullet} Memory: {{memory_percent:.1f}}%\n"
+        f"{bullet} CPU: {{cpu_percent:.1f}}%\n"
+        f"{bullet} Swap: {{swap_percent:.1f}}%\n"
+        f"{bullet} Disk: {{disk_percent:.1f}}%"
+        f"{footer}"
+    )
+
+# Per-platform markup, with the stats section precompiled into a bound str.format
+_TEMPLATES = {
+    'feishu': {
+        'bullet': "•",
+        'stats_fmt': _stats_template("•", "**").format,
+    },
+    'slack': {
+        'bullet': "•",
+        'stats_fmt': _stats_template("•", "*", "\n\n_Alert Time: {timestamp}_").format,
+    },
+    'mattermost': {
+        'bullet': "*",
+        'stats_fmt': _stats_template("*", "**", "\n\n*Alert Time: {timestamp}*").format,
+    },
+}
+
+def _format_top_processes(top_processes, bullet, header):
+    """Format the top memory processes section using the platform's bullet and header markup"""
+    if top_processes is None:
+        return ""
+    
+    return f"\n\n{header}\n" + "\n".join([
+        f"{bullet} {p['name']} (PID {p['pid']}): Memory {p['memory_percent']:.1f}%, CPU {p['cpu_percent']:.1f}%"
+        for p in top_processes
+    ])
+
+def _recovery_outcome(cmd, returncode):
+    """Log the result of a recovery command and return its (result line, success) pair"""
+    if returncode == 0:
+        logger.info("Command executed successfully: %s", cmd)
+        return f"✅ {cmd}", True
+    
+    e = subprocess.CalledProcessError(returncode, cmd)
+    logger.error("Failed to execute command: %s, error: %s", cmd, e)
+    return f"❌ {cmd} (Error: {str(e)})", False
+
+def _run_recovery_command(cmd):
+    """Run a single recovery command and wait for it to finish"""
+    logger.info("Executing command: %s", cmd)
+    result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+    return _recovery_outcome(cmd, result.returncode)
+
+async def _run_recovery_commands_concurrently(commands):
+    """Run all recovery commands concurrently, returning outcomes in command order"""
+    async def run_one(cmd):
+        logger.info("Executing command: %s", cmd)
+        process = await asyncio.create_subprocess_shell(
+            cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        await process.communicate()
+        return _recovery_outcome(cmd, process.returncode)
     
-    return alerts, get_system_stats()
+    # gather() returns results in the order the commands were given
+    return await asyncio.gather(*[run_one(cmd) for cmd in commands])
 
 def execute_recovery_commands():
     """Execute recovery commands and return results"""
@@ -135,35 +326,27 @@ def execute_recovery_commands():
         logger.info("No recovery commands configured")
         return "No recovery commands configured", False
     
-    logger.info(f"Executing recovery commands: {CONFIG['recovery_commands']}")
+    logger.info("Executing recovery commands: %s", CONFIG['recovery_commands'])
     
     if CONFIG['test_mode']:
         logger.info("TEST MODE: Would execute recovery commands")
         return CONFIG['recovery_commands'], True
     
-    results = []
-    success = True
+    # Split into individual commands, dropping empty entries
+    commands = [cmd.strip() for cmd in CONFIG['recovery_commands'].split(';') if cmd.strip()]
     
-    # Split and execute multiple commands
-    commands = CONFIG['recovery_commands'].split(';')
-    for cmd in commands:
-        cmd = cmd.strip()
-        if not cmd:
-            continue
-            
-        try:
-            logger.info(f"Executing command: {cmd}")
-            result = subprocess.run(cmd, shell=True, check=True, capture_output=True, text=True)
-            results.append(f"✅ {cmd}")
-            logger.info(f"Command executed successfully: {cmd}")
-        except subprocess.CalledProcessError as e:
-            results.append(f"❌ {cmd} (Error: {str(e)})")
-            logger.error(f"Failed to execute command: {cmd}, error: {str(e)}")
-            success = False
+    if CONFIG['recovery_sequential']:
+        # Commands may depend on each other, run them in the configured order
+        outcomes = [_run_recovery_command(cmd) for cmd in commands]
+    else:
+        # Commands are independent, so run them all at once
+        outcomes = asyncio.run(_run_recovery_commands_concurrently(commands))
     
+    results = [line for line, _ in outcomes]
+    success = all(ok for _, ok in outcomes)
     return "\n".join(results), success
 
-def send_feishu_notification(alerts, stats, is_recovery_check=False, recovery_results=None):
+def send_feishu_notification(alerts, stats, is_recovery_check=False, recovery_results=None, top_processes=None):
     """Send alert to Feishu webhook"""
     # Skip if webhook not configured
     if not CONFIG['feishu_webhook_url']:
@@ -181,10 +364,7 @@ def send_feishu_notification(alerts, stats, is_recovery_check=False, recovery_re
             header_template = "orange"
             content_prefix = "System resources are still exceeding thresholds after recovery attempts:"
             
-        alert_details = "\n".join([
-            f"• {a['resource'].replace('_', ' ').title()}: {a['value']:.1f}% (threshold: {a['threshold']}%)"
-            for a in alerts
-        ]) if alerts else ""
+        alert_details = _build_alert_details(alerts, _TEMPLATES['feishu']['bullet'])
         
         recovery_info = f"\n\n**Recovery Commands Executed:**\n{recovery_results}" if recovery_results else ""
         
@@ -193,26 +373,12 @@ def send_feishu_notification(alerts, stats, is_recovery_check=False, recovery_re
         header_template = "red"
         content_prefix = f"The following resources have exceeded thresholds for {CONFIG['check_count']} consecutive checks:"
         
-        alert_details = "\n".join([
-            f"• {a['resource'].replace('_', ' ').title()}: {a['value']:.1f}% (threshold: {a['threshold']}%)"
-            for a in alerts
-        ])
+        alert_details = _build_alert_details(alerts, _TEMPLATES['feishu']['bullet'])
         
         recovery_info = f"\n\n**Recovery Commands to Execute:**\n{CONFIG['recovery_commands']}" if CONFIG['recovery_commands'] else ""
     
-    # Get process information for high memory usage case
-    top_processes = ""
-    if any(a['resource'] == 'memory_percent' for a in alerts):
-        processes = sorted(
-            [p for p in psutil.process_iter(['pid', 'name', 'memory_percent', 'cpu_percent'])],
-            key=lambda p: p.info['memory_percent'],
-            reverse=True
-        )[:5]
-        
-        top_processes = "\n\n**Top Memory Processes:**\n" + "\n".join([
-            f"• {p.info['name']} (PID {p.info['pid']}): Memory {p.info['memory_percent']:.1f}%, CPU {p.info['cpu_percent']:.1f}%"
-            for p in processes
-        ])
+    # Add process information for high memory usage case
+    top_processes_info = _format_top_processes(top_processes, _TEMPLATES['feishu']['bullet'], "**Top Memory Processes:**")
     
     # Create message
     message = {
@@ -233,7 +399,7 @@ def send_feishu_notification(alerts, stats, is_recovery_check=False, recovery_re
                     "tag": "div",
                     "text": {
                         "tag": "lark_md",
-                        "content": f"{content_prefix}\n{alert_details}{recovery_info}{top_processes}"
+                        "content": f"{content_prefix}\n{alert_details}{recovery_info}{top_processes_info}"
                     }
                 },
                 {
@@ -243,7 +409,7 @@ def send_feishu_notification(alerts, stats, is_recovery_check=False, recovery_re
                     "tag": "div",
                     "text": {
                         "tag": "lark_md",
-                        "content": f"**Current System Stats:**\n• Memory: {stats['memory_percent']:.1f}%\n• CPU: {stats['cpu_percent']:.1f}%\n• Swap: {stats['swap_percent']:.1f}%\n• Disk: {stats['disk_percent']:.1f}%"
+                        "content": _TEMPLATES['feishu']['stats_fmt'](**stats)
                     }
                 },
                 {
@@ -266,22 +432,18 @@ def send_feishu_notification(alerts, stats, is_recovery_check=False, recovery_re
         return True
     
     try:
-        response = requests.post(
-            CONFIG['feishu_webhook_url'],
-            headers={"Content-Type": "application/json"},
-            data=json.dumps(message)
-        )
+        response = post_json(CONFIG['feishu_webhook_url'], message)
         if response.status_code == 200:
             logger.info("Alert sent to Feishu successfully")
             return True
         else:
-            logger.error(f"Failed to send alert to Feishu: {response.status_code} {response.text}")
+            logger.error("Failed to send alert to Feishu: %s %s", response.status_code, response.text)
             return False
     except Exception as e:
-        logger.error(f"Error sending alert to Feishu: {str(e)}")
+        logger.error("Error sending alert to Feishu: %s", e)
         return False
 
-def send_slack_notification(alerts, stats, is_recovery_check=False, recovery_results=None):
+def send_slack_notification(alerts, stats, is_recovery_check=False, recovery_results=None, top_processes=None):
     """Send alert to Slack webhook"""
     # Skip if webhook not configured
     if not CONFIG['slack_webhook_url']:
@@ -301,12 +463,7 @@ def send_slack_notification(alerts, stats, is_recovery_check=False, recovery_res
         content_prefix = f"The following resources have exceeded thresholds for {CONFIG['check_count']} consecutive checks:"
 
     # Format alert details
-    alert_details = ""
-    if alerts:
-        alert_details = "\n".join([
-            f"• {a['resource'].replace('_', ' ').title()}: {a['value']:.1f}% (threshold: {a['threshold']}%)"
-            for a in alerts
-        ])
+    alert_details = _build_alert_details(alerts, _TEMPLATES['slack']['bullet'])
     
     # Add recovery information if applicable
     recovery_info = ""
@@ -316,28 +473,10 @@ def send_slack_notification(alerts, stats, is_recovery_check=False, recovery_res
         recovery_info = f"\n\n*Recovery Commands to Execute:*\n{CONFIG['recovery_commands']}"
     
     # Add process information for high memory usage
-    top_processes = ""
-    if any(a['resource'] == 'memory_percent' for a in alerts):
-        processes = sorted(
-            [p for p in psutil.process_iter(['pid', 'name', 'memory_percent', 'cpu_percent'])],
-            key=lambda p: p.info['memory_percent'],
-            reverse=True
-        )[:5]
-        
-        top_processes = "\n\n*Top Memory Processes:*\n" + "\n".join([
-            f"• {p.info['name']} (PID {p.info['pid']}): Memory {p.info['memory_percent']:.1f}%, CPU {p.info['cpu_percent']:.1f}%"
-            for p in processes
-        ])
+    top_processes_info = _format_top_processes(top_processes, _TEMPLATES['slack']['bullet'], "*Top Memory Processes:*")
     
     # Build system stats section
-    system_stats = (
-        f"*Current System Stats:*\n"
-        f"• Memory: {stats['memory_percent']:.1f}%\n"
-        f"• CPU: {stats['cpu_percent']:.1f}%\n"
-        f"• Swap: {stats['swap_percent']:.1f}%\n"
-        f"• Disk: {stats['disk_percent']:.1f}%\n\n"
-        f"_Alert Time: {stats['timestamp']}_"
-    )
+    system_stats = _TEMPLATES['slack']['stats_fmt'](**stats)
     
     # Create Slack message payload
     message = {
@@ -354,7 +493,7 @@ def send_slack_notification(alerts, stats, is_recovery_check=False, recovery_res
                 "type": "section",
                 "text": {
                     "type": "mrkdwn",
-                    "text": f"{content_prefix}\n{alert_details}{recovery_info}{top_processes}"
+                    "text": f"{content_prefix}\n{alert_details}{recovery_info}{top_processes_info}"
                 }
             },
             {
@@ -377,22 +516,18 @@ def send_slack_notification(alerts, stats, is_recovery_check=False, recovery_res
         return True
     
     try:
-        response = requests.post(
-            CONFIG['slack_webhook_url'],
-            headers={"Content-Type": "application/json"},
-            data=json.dumps(message)
-        )
+        response = post_json(CONFIG['slack_webhook_url'], message)
         if response.status_code == 200:
             logger.info("Alert sent to Slack successfully")
             return True
         else:
-            logger.error(f"Failed to send alert to Slack: {response.status_code} {response.text}")
+            logger.error("Failed to send alert to Slack: %s %s", response.status_code, response.text)
             return False
     except Exception as e:
-        logger.error(f"Error sending alert to Slack: {str(e)}")
+        logger.error("Error sending alert to Slack: %s", e)
         return False
 
-def send_mattermost_notification(alerts, stats, is_recovery_check=False, recovery_results=None):
+def send_mattermost_notification(alerts, stats, is_recovery_check=False, recovery_results=None, top_processes=None):
     """Send alert to Mattermost webhook"""
     # Skip if webhook not configured
     if not CONFIG['mattermost_webhook_url']:
@@ -412,12 +547,7 @@ def send_mattermost_notification(alerts, stats, is_recovery_check=False, recover
         content_prefix = f"The following resources have exceeded thresholds for {CONFIG['check_count']} consecutive checks:"
 
     # Format alert details
-    alert_details = ""
-    if alerts:
-        alert_details = "\n" + "\n".join([
-            f"* {a['resource'].replace('_', ' ').title()}: {a['value']:.1f}% (threshold: {a['threshold']}%)"
-            for a in alerts
-        ])
+    alert_details = "\n" + _build_alert_details(alerts, _TEMPLATES['mattermost']['bullet']) if alerts else ""
     
     # Add recovery information if applicable
     recovery_info = ""
@@ -427,34 +557,15 @@ def send_mattermost_notification(alerts, stats, is_recovery_check=False, recover
         recovery_info = f"\n\n**Recovery Commands to Execute:**\n```\n{CONFIG['recovery_commands']}\n```"
     
     # Add process information for high memory usage
-    top_processes = ""
-    if any(a['resource'] == 'memory_percent' for a in alerts):
-        processes = sorted(
-            [p for p in psutil.process_iter(['pid', 'name', 'memory_percent', 'cpu_percent'])],
-            key=lambda p: p.info['memory_percent'],
-            reverse=True
-        )[:5]
-        
-        process_list = "\n" + "\n".join([
-            f"* {p.info['name']} (PID {p.info['pid']}): Memory {p.info['memory_percent']:.1f}%, CPU {p.info['cpu_percent']:.1f}%"
-            for p in processes
-        ])
-        top_processes = f"\n\n**Top Memory Processes:**{process_list}"
+    top_processes_info = _format_top_processes(top_processes, _TEMPLATES['mattermost']['bullet'], "**Top Memory Processes:**")
     
     # Build system stats section
-    system_stats = (
-        f"**Current System Stats:**\n"
-        f"* Memory: {stats['memory_percent']:.1f}%\n"
-        f"* CPU: {stats['cpu_percent']:.1f}%\n"
-        f"* Swap: {stats['swap_percent']:.1f}%\n"
-        f"* Disk: {stats['disk_percent']:.1f}%\n\n"
-        f"*Alert Time: {stats['timestamp']}*"
-    )
+    system_stats = _TEMPLATES['mattermost']['stats_fmt'](**stats)
     
     # Create Mattermost message text
     text = (
         f"{header}\n\n"
-        f"{content_prefix}{alert_details}{recovery_info}{top_processes}\n\n"
+        f"{content_prefix}{alert_details}{recovery_info}{top_processes_info}\n\n"
         f"---\n\n"
         f"{system_stats}"
     )
@@ -471,19 +582,15 @@ def send_mattermost_notification(alerts, stats, is_recovery_check=False, recover
         return True
     
     try:
-        response = requests.post(
-            CONFIG['mattermost_webhook_url'],
-            headers={"Content-Type": "application/json"},
-            data=json.dumps(message)
-        )
+        response = post_json(CONFIG['mattermost_webhook_url'], message)
         if response.status_code == 200:
             logger.info("Alert sent to Mattermost successfully")
             return True
         else:
-            logger.error(f"Failed to send alert to Mattermost: {response.status_code} {response.text}")
+            logger.error("Failed to send alert to Mattermost: %s %s", response.status_code, response.text)
             return False
     except Exception as e:
-        logger.error(f"Error sending alert to Mattermost: {str(e)}")
+        logger.error("Error sending alert to Mattermost: %s", e)
         return False
 
 def send_alert(alerts, stats, is_recovery_check=False, recovery_results=None):
@@ -496,25 +603,21 @@ def send_alert(alerts, stats, is_recovery_check=False, recovery_results=None):
         logger.error("No notification webhook URLs configured. Set at least one webhook URL in the environment variables.")
         return False
     
-    success = False
-    
-    # Send to all configured platforms
-    if CONFIG['feishu_webhook_url']:
-        if send_feishu_notification(alerts, stats, is_recovery_check, recovery_results):
-            success = True
-    
-    if CONFIG['slack_webhook_url']:
-        if send_slack_notification(alerts, stats, is_recovery_check, recovery_results):
-            success = True
-    
-    if CONFIG['mattermost_webhook_url']:
-        if send_mattermost_notification(alerts, stats, is_recovery_check, recovery_results):
-            success = True
+    # Scan processes once for all platforms when memory is among the alerts
+    top_processes = None
+    if any(a['resource'] == 'memory_percent' for a in alerts):
+        top_processes = _top_memory_processes(5)
     
-    return success
+    senders = (
+        ('feishu_webhook_url', send_feishu_notification),
+        ('slack_webhook_url', send_slack_notification),
+        ('mattermost_webhook_url', send_mattermost_notification),
+    )
+    return notify_all(CONFIG, senders, alerts, stats, is_recovery_check, recovery_results, top_processes)
 
 def main():
     """Main function to check resources and send alerts if needed"""
+    setup_logging(CONFIG['log_file'])
     logger.info("Starting server resource check")
     
     try:
@@ -529,7 +632,7 @@ def main():
         
         alerts, stats = check_resource_issues()
         if alerts:
-            logger.warning(f"Resource alerts triggered: {alerts}")
+            logger.warning("Resource alerts triggered: %s", alerts)
             send_alert(alerts, stats)
             
             # Check if alerts contain memory or CPU issues
@@ -540,12 +643,20 @@ def main():
                 logger.info("Memory or CPU issues detected, executing recovery commands")
                 recovery_results, success = execute_recovery_commands()
                 
-                # Wait for specified time
-                logger.info(f"Waiting {CONFIG['recovery_wait_time']} seconds for recovery...")
-                time.sleep(CONFIG['recovery_wait_time'])
+                # Wait up to the specified time, finishing as soon as resources are back to normal
+                logger.info("Waiting up to %s seconds for recovery...", CONFIG['recovery_wait_time'])
+                recovered = False
+                if wait_for_recovery():
+                    # Confirm with one snapshot covering a full check_interval of CPU
+                    logger.info("Memory, swap and disk are below thresholds, confirming with a single check")
+                    recovery_alerts, recovery_stats = check_resource_issues(check_count=1)
+                    recovered = not recovery_alerts
+                    if not recovered:
+                        logger.info("Resources still exceed thresholds, running the full recheck")
                 
-                # Recheck resource status
-                recovery_alerts, recovery_stats = check_resource_issues()
+                if not recovered:
+                    # Recheck resource status
+                    recovery_alerts, recovery_stats = check_resource_issues()
                 
                 # Send recovery status notification
                 send_alert(recovery_alerts, recovery_stats, is_recovery_check=True, recovery_results=recovery_results)
@@ -555,7 +666,7 @@ def main():
             logger.info("No resource issues detected")
             
     except Exception as e:
-        logger.error(f"Error in monitoring script: {str(e)}", exc_info=True)
+        logger.error("Error in monitoring script: %s", e, exc_info=True)
 
 if __name__ == "__main__":
     main()
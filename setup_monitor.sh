@@ -6,6 +6,9 @@ set -e
 SCRIPT_DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" &> /dev/null && pwd )"
 MONITOR_SCRIPT="$SCRIPT_DIR/server_monitor.py"
 NETWORK_SCRIPT="$SCRIPT_DIR/network_monitor.py"
+DAEMON_SCRIPT="$SCRIPT_DIR/monitor_daemon.py"
+SERVICE_TEMPLATE="$SCRIPT_DIR/system_monitor.service"
+SERVICE_FILE="/etc/systemd/system/system_monitor.service"
 ENV_EXAMPLE="$SCRIPT_DIR/.env.example"
 ENV_FILE="$SCRIPT_DIR/.env"
 DEFAULT_LOG_FILE="/var/log/server_monitor.log"
@@ -16,6 +19,7 @@ ensure_permissions() {
     echo "Setting correct permissions for scripts..."
     chmod +x "$SCRIPT_DIR/server_monitor.py"
     chmod +x "$SCRIPT_DIR/network_monitor.py"
+    chmod +x "$SCRIPT_DIR/monitor_daemon.py"
     chmod +x "$SCRIPT_DIR/setup_monitor.sh"
     
     # Add any other scripts that need executable permissions
@@ -59,6 +63,18 @@ setup_log_file() {
     echo "Log file configured: $LOG_FILE"
 }
 
+# Shared helpers (pin_recovery_order)
+. "$SCRIPT_DIR/monitor_common.sh"
+
+# Run both monitors as a single systemd service instead of cron jobs.
+# An update keeps whichever mode is installed so it does not bring back the cron jobs.
+USE_DAEMON=false
+if [ "$1" = "--daemon" ]; then
+    USE_DAEMON=true
+elif [ "$1" = "--update" ] && [ -f "$SERVICE_FILE" ]; then
+    USE_DAEMON=true
+fi
+
 echo "Setting up server monitoring..."
 
 # Always ensure permissions are correct (helpful after rsync updates)
@@ -82,18 +98,37 @@ if [ ! -f "$ENV_FILE" ]; then
     read -p "Press Enter to continue after editing the .env file..."
 else
     echo "Using existing .env file."
+    pin_recovery_order
 fi
 
 # Set up log file with appropriate permissions
 setup_log_file
 
-# Set up cron jobs
-echo "Setting up cron jobs..."
-RESOURCE_CRON_JOB="*/30 * * * * cd $SCRIPT_DIR && RUNNING_FROM_CRON=true python3 $MONITOR_SCRIPT"
-NETWORK_CRON_JOB="*/10 * * * * cd $SCRIPT_DIR && RUNNING_FROM_CRON=true python3 $NETWORK_SCRIPT"
+if [ "$USE_DAEMON" = true ]; then
+    # Set up systemd service and remove any cron jobs it replaces
+    echo "Setting up systemd service..."
+    sed "s|__SCRIPT_DIR__|$SCRIPT_DIR|g" "$SERVICE_TEMPLATE" | sudo tee "$SERVICE_FILE" > /dev/null
+    (crontab -l 2>/dev/null || echo "") | grep -v "$MONITOR_SCRIPT" | grep -v "$NETWORK_SCRIPT" | crontab -
+    sudo systemctl daemon-reload
+    sudo systemctl enable system_monitor.service
+    sudo systemctl restart system_monitor.service
+else
+    # Stop a previously installed daemon so the monitors don't run twice
+    if [ -f "$SERVICE_FILE" ]; then
+        echo "Removing systemd service replaced by cron jobs..."
+        sudo systemctl disable --now system_monitor.service || true
+        sudo rm -f "$SERVICE_FILE"
+        sudo systemctl daemon-reload
+    fi
+    
+    # Set up cron jobs
+    echo "Setting up cron jobs..."
+    RESOURCE_CRON_JOB="*/30 * * * * cd $SCRIPT_DIR && RUNNING_FROM_CRON=true python3 $MONITOR_SCRIPT"
+    NETWORK_CRON_JOB="*/10 * * * * cd $SCRIPT_DIR && RUNNING_FROM_CRON=true python3 $NETWORK_SCRIPT"
 
-# Remove old entries and add new ones
-(crontab -l 2>/dev/null || echo "") | grep -v "$MONITOR_SCRIPT" | grep -v "$NETWORK_SCRIPT" | { cat; echo "$RESOURCE_CRON_JOB"; echo "$NETWORK_CRON_JOB"; } | crontab -
+    # Remove old entries and add new ones
+    (crontab -l 2>/dev/null || echo "") | grep -v "$MONITOR_SCRIPT" | grep -v "$NETWORK_SCRIPT" | { cat; echo "$RESOURCE_CRON_JOB"; echo "$NETWORK_CRON_JOB"; } | crontab -
+fi
 
 # Check if any webhook URL is configured
 if ! grep -q -E "^(FEISHU|SLACK|MATTERMOST)_WEBHOOK_URL=.+" "$ENV_FILE" || grep -q "your-webhook-token-here" "$ENV_FILE"; then
@@ -109,6 +144,9 @@ fi
 echo "Setup complete! Server monitoring is now active."
 echo "Resource monitoring will run every 30 minutes."
 echo "Network monitoring will run every 10 minutes."
+if [ "$USE_DAEMON" = true ]; then
+    echo "Both monitors run in the system_monitor systemd service: systemctl status system_monitor"
+fi
 echo "Log file: $LOG_FILE"
 echo "Environment configuration: $ENV_FILE"
 echo ""
@@ -4,18 +4,34 @@ set -e
 
 # Script location
 SCRIPT_DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" &> /dev/null && pwd )"
+ENV_FILE="$SCRIPT_DIR/.env"
+SERVICE_FILE="/etc/systemd/system/system_monitor.service"
+
+# Shared helpers (pin_recovery_order)
+. "$SCRIPT_DIR/monitor_common.sh"
 
 echo "Updating server monitoring system permissions..."
 
 # Ensure scripts have executable permissions
 chmod +x "$SCRIPT_DIR/server_monitor.py"
 chmod +x "$SCRIPT_DIR/network_monitor.py"
+chmod +x "$SCRIPT_DIR/monitor_daemon.py"
 chmod +x "$SCRIPT_DIR/setup_monitor.sh"
 chmod +x "$SCRIPT_DIR/update_monitor.sh"
 
 echo "Permissions restored successfully."
+
+# Keep existing recovery command chains running in order
+pin_recovery_order
+
+# A running daemon keeps executing the old code until it is restarted
+if [ -f "$SERVICE_FILE" ]; then
+    echo "Restarting system_monitor service..."
+    sudo systemctl try-restart system_monitor.service
+fi
+
 echo "System monitoring will continue to function normally."
 echo ""
 echo "If you made changes to configuration, you may want to run:"
-echo "sudo ./setup_monitor.sh"
+echo "sudo ./setup_monitor.sh --update"
 echo "to ensure all settings are applied correctly."